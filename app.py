@@ -2,13 +2,20 @@
 
 import os
 import uuid
-import threading
+import queue
 import json
 import logging
-from flask import Flask, request, render_template, redirect, url_for, flash, send_from_directory, jsonify
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, render_template, url_for, send_from_directory, jsonify, Response
 from werkzeug.utils import secure_filename
 
-from pipeline import run_pipeline
+from pipeline import run_pipeline, new_file_hasher
+
+try:
+    from celery import Celery
+except ImportError:
+    Celery = None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'a-very-secret-key-that-you-should-change'
@@ -17,38 +24,126 @@ app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024 * 1024
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 ALLOWED_EXTENSIONS = {'mp4', 'mov', 'avi', 'mkv'}
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def update_status(task_dir, status, summary_path=None):
+# In-process status channels for Server-Sent Events: task_id -> queue.Queue.
+# Each running task pushes its status transitions here so connected clients
+# get pushed updates instead of polling status.json from disk.
+task_channels = {}
+
+# Per-task filesystem layout, computed once at upload instead of re-joined on
+# every status poll and data route. Tasks from before a restart (or served by
+# another process) are reconstructed on demand — video_path is then unknown,
+# but no route needs it after upload.
+TaskPaths = namedtuple('TaskPaths', 'task_dir video_path status_path')
+_TASKS = {}
+
+# Parsed-status cache for the polling route: task_id -> (mtime_ns, payload
+# bytes). status.json writes are atomic renames, so the mtime is a reliable
+# change marker and doubles as the ETag value.
+_STATUS_CACHE = {}
+
+def _task_paths(task_id, video_path=None):
+    paths = _TASKS.get(task_id)
+    if paths is None:
+        task_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
+        paths = TaskPaths(task_dir, video_path,
+                          os.path.join(task_dir, 'status.json'))
+        _TASKS[task_id] = paths
+    return paths
+
+def is_terminal_status(status_data):
+    status = status_data.get("status", "")
+    return status.startswith("Complete") or status.startswith("Error")
+
+def update_status(task_id, status, summary_path=None):
     status_data = {"status": status}
     if summary_path:
         status_data["summary_filename"] = os.path.basename(summary_path)
-    with open(os.path.join(task_dir, 'status.json'), 'w') as f:
+    # Keep status.json on disk so a page reload (or server restart) can
+    # recover the last known state, then push to any live SSE subscribers.
+    # Write-then-rename so readers polling the file never see a torn write.
+    status_path = _task_paths(task_id).status_path
+    tmp_path = status_path + '.tmp'
+    with open(tmp_path, 'w') as f:
         json.dump(status_data, f)
+    os.replace(tmp_path, status_path)
+    channel = task_channels.get(task_id)
+    if channel is not None:
+        channel.put(status_data)
+    if is_terminal_status(status_data):
+        # Drop the per-task entries here rather than relying on an SSE
+        # subscriber to observe the terminal state: poll-only clients and
+        # closed tabs would otherwise leave them in these dicts for the life
+        # of the server. A connected stream still delivers the final message
+        # through the queue reference it already holds, and later requests
+        # rebuild paths on demand via _task_paths.
+        task_channels.pop(task_id, None)
+        _STATUS_CACHE.pop(task_id, None)
+        _TASKS.pop(task_id, None)
 
-def process_with_pipeline(task_id, video_path):
+def process_with_pipeline(task_id, video_path, video_hash=None):
     """Wrapper function to run the pipeline with status updates."""
-    task_dir = os.path.dirname(video_path)
     try:
         logging.info(f"[{task_id}] Pipeline started.")
-        
+
         # Call the caching-enabled pipeline
-        update_status(task_dir, "Checking for cached results...")
-        results = run_pipeline(video_path, task_id)
+        update_status(task_id, "Checking for cached results...")
+        results = run_pipeline(video_path, task_id, video_hash=video_hash)
 
         if not results.get('summary_path'):
-            update_status(task_dir, "Error: Pipeline failed to produce summary video.")
+            update_status(task_id, "Error: Pipeline failed to produce summary video.")
             return
 
-        update_status(task_dir, "Complete", results['summary_path'])
+        update_status(task_id, "Complete", results['summary_path'])
         logging.info(f"[{task_id}] Pipeline finished successfully.")
     except Exception as e:
         logging.error(f"[{task_id}] Pipeline error: {str(e)}")
-        update_status(task_dir, f"Error: {str(e)}")
+        update_status(task_id, f"Error: {str(e)}")
         return
 
 
+# --- BACKGROUND JOB DISPATCH ---
+# With a broker configured (CELERY_BROKER_URL) and celery installed, pipeline
+# jobs run in dedicated worker processes (start them with
+# `celery -A app worker --concurrency=N`), keeping the long-running CPU work
+# off the web tier and allowing scale-out across hosts. Without a broker the
+# app keeps the original single-process behavior with a background thread.
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
+if Celery is not None and CELERY_BROKER_URL:
+    celery_app = Celery('video_summarizer', broker=CELERY_BROKER_URL)
+
+    @celery_app.task(name='video_summarizer.pipeline_task')
+    def pipeline_task(task_id, video_path, video_hash=None):
+        process_with_pipeline(task_id, video_path, video_hash)
+else:
+    celery_app = None
+    pipeline_task = None
+
+def _pipeline_worker_count():
+    """Concurrent pipelines for the in-process fallback. Each run holds the
+    Whisper model and a set of ffmpeg subprocesses, so an unbounded thread
+    per upload can OOM the host; PIPELINE_WORKERS overrides."""
+    try:
+        return max(1, int(os.environ['PIPELINE_WORKERS']))
+    except (KeyError, ValueError):
+        return 2
+
+# Bounded pool instead of one unbounded thread per upload: excess uploads
+# queue (visible to clients as the "Queued" status) rather than all competing
+# for the model, CPU and memory at once.
+_PIPELINE_POOL = ThreadPoolExecutor(max_workers=_pipeline_worker_count())
+
+def submit_pipeline_job(task_id, video_path, video_hash):
+    if pipeline_task is not None:
+        pipeline_task.delay(task_id, video_path, video_hash)
+    else:
+        _PIPELINE_POOL.submit(process_with_pipeline, task_id, video_path, video_hash)
+
+
 # --- FLASK ROUTES ---
 @app.route('/')
 def index():
@@ -56,26 +151,54 @@ def index():
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    if 'file' not in request.files:
-        flash('No file part')
-        return redirect(request.url)
-    file = request.files['file']
-    if file.filename == '':
-        flash('No selected file')
-        return redirect(request.url)
-    if file and allowed_file(file.filename):
-        original_filename = secure_filename(file.filename)
-        task_id = str(uuid.uuid4())
-        task_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
-        os.makedirs(task_dir, exist_ok=True)
-        video_path = os.path.join(task_dir, original_filename)
-        file.save(video_path)
-        pipeline_thread = threading.Thread(target=process_with_pipeline, args=(task_id, video_path))
-        pipeline_thread.start()
-        return redirect(url_for('task_status', task_id=task_id))
-    else:
-        flash('Invalid file type.')
-        return redirect(url_for('index'))
+    # The client sends the raw file bytes as the request body with the
+    # filename in the query string, so the upload streams straight to disk
+    # in large chunks instead of going through Werkzeug's multipart parser
+    # (which buffers through a spooled temp file and is CPU-bound on
+    # multi-GB videos).
+    filename = request.args.get('filename', '')
+    if not filename:
+        return jsonify({"error": "No selected file"}), 400
+    if not allowed_file(filename):
+        return jsonify({"error": "Invalid file type."}), 400
+
+    original_filename = secure_filename(filename)
+    task_id = str(uuid.uuid4())
+    task_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
+    os.makedirs(task_dir, exist_ok=True)
+    video_path = os.path.join(task_dir, original_filename)
+    _TASKS[task_id] = TaskPaths(task_dir, video_path,
+                                os.path.join(task_dir, 'status.json'))
+    # Hash the bytes as they stream in, so the pipeline's cache key doesn't
+    # need a second full read of the file after the upload finishes.
+    hasher = new_file_hasher()
+    # MAX_CONTENT_LENGTH is enforced here by hand: Werkzeug applies it to
+    # form parsing, which the raw-body upload deliberately bypasses.
+    max_bytes = app.config['MAX_CONTENT_LENGTH']
+    received = 0
+    with open(video_path, 'wb') as f:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > max_bytes:
+                f.close()
+                os.remove(video_path)
+                return jsonify({"error": "File too large."}), 413
+            hasher.update(chunk)
+            f.write(chunk)
+    if pipeline_task is None:
+        # In Celery mode the worker can't feed an in-process queue (and the
+        # terminal-status cleanup in update_status runs in the worker), so
+        # creating a channel here would only leak it. SSE clients fall back
+        # to replaying status.json on reconnect instead.
+        task_channels[task_id] = queue.Queue()
+    # Written before submission so a backlogged pool shows backpressure
+    # ("Queued") instead of "Initializing...".
+    update_status(task_id, "Queued")
+    submit_pipeline_job(task_id, video_path, hasher.hexdigest())
+    return jsonify({"task_id": task_id, "redirect": url_for('task_status', task_id=task_id)})
 
 @app.route('/task/<task_id>')
 def task_status(task_id):
@@ -83,33 +206,96 @@ def task_status(task_id):
 
 @app.route('/task/<task_id>/status')
 def get_task_status_json(task_id):
-    task_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
-    status_file = os.path.join(task_dir, 'status.json')
+    status_file = _task_paths(task_id).status_path
     try:
-        with open(status_file, 'r') as f:
-            status_data = json.load(f)
-        return jsonify(status_data)
+        mtime_ns = os.stat(status_file).st_mtime_ns
     except FileNotFoundError:
         return jsonify({"status": "Initializing..."})
+    etag = f'"{mtime_ns}"'
+    if request.headers.get('If-None-Match') == etag:
+        # Client already holds the current state: one stat, no read, no body.
+        return Response(status=304, headers={'ETag': etag})
+    cached = _STATUS_CACHE.get(task_id)
+    if cached is None or cached[0] != mtime_ns:
+        try:
+            with open(status_file, 'rb') as f:
+                payload = f.read()
+            status_data = json.loads(payload)  # reject files from pre-atomic writers
+        except (FileNotFoundError, ValueError):
+            return jsonify({"status": "Initializing..."})
+        cached = (mtime_ns, payload)
+        # Terminal states are served but never cached, and serving one also
+        # drops the per-task entries: when the pipeline runs in a Celery
+        # worker, update_status's cleanup happens in the worker process, so
+        # this is the web tier's only chance to evict for poll-only clients.
+        if not is_terminal_status(status_data):
+            _STATUS_CACHE[task_id] = cached
+        else:
+            task_channels.pop(task_id, None)
+            _STATUS_CACHE.pop(task_id, None)
+            _TASKS.pop(task_id, None)
+    response = Response(cached[1], mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache, must-revalidate'
+    return response
+
+@app.route('/task/<task_id>/status-stream')
+def stream_task_status(task_id):
+    """Pushes status transitions to the client over a single SSE connection."""
+    status_path = _task_paths(task_id).status_path
+    channel = task_channels.get(task_id)
+
+    def generate():
+        yield "retry: 5000\n\n"
+        # Replay the last known state first so (re)connecting clients catch up.
+        try:
+            with open(status_path, 'r') as f:
+                status_data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            status_data = {"status": "Initializing..."}
+        yield f"data: {json.dumps(status_data)}\n\n"
+        if channel is None or is_terminal_status(status_data):
+            return
+        last_sent = status_data
+        while True:
+            try:
+                msg = channel.get(timeout=5)
+            except queue.Empty:
+                # No in-process update. When the pipeline runs in a Celery
+                # worker the queue is never fed, so fall back to the on-disk
+                # status; otherwise keep the connection alive.
+                try:
+                    with open(status_path, 'r') as f:
+                        msg = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    msg = None
+                if msg is None or msg == last_sent:
+                    yield ": keep-alive\n\n"
+                    continue
+            yield f"data: {json.dumps(msg)}\n\n"
+            last_sent = msg
+            if is_terminal_status(msg):
+                task_channels.pop(task_id, None)
+                _STATUS_CACHE.pop(task_id, None)
+                return
+
+    return Response(generate(), mimetype='text/event-stream')
 
 # --- NEW DATA-SERVING ROUTES FOR THE GUI ---
 @app.route('/task/<task_id>/events')
 def get_task_events(task_id):
     """Serves the generated events.json file."""
-    task_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
-    return send_from_directory(task_dir, 'events.json')
+    return send_from_directory(_task_paths(task_id).task_dir, 'events.json')
 
 @app.route('/task/<task_id>/transcript')
 def get_task_transcript(task_id):
     """Serves the generated transcript.txt file."""
-    task_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
-    return send_from_directory(task_dir, 'transcript.txt')
+    return send_from_directory(_task_paths(task_id).task_dir, 'transcript.txt')
     
 @app.route('/stream/<task_id>/<filename>')
 def stream_file(task_id, filename):
     """Serves the final video for embedding in the <video> tag."""
-    task_dir = os.path.join(app.config['UPLOAD_FOLDER'], task_id)
-    return send_from_directory(task_dir, filename)
+    return send_from_directory(_task_paths(task_id).task_dir, filename)
 
 if __name__ == '__main__':
     app.run(debug=True)
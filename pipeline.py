@@ -2,17 +2,48 @@
 
 import os
 import json
-# subprocess is still needed for extract_audio
+import mmap
+import wave
+import bisect
+import shutil
+import asyncio
 import subprocess
 import logging
+import threading
 import datetime
-import whisper
+from faster_whisper import WhisperModel
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:
+    BatchedInferencePipeline = None  # older faster-whisper: serial decoding only
+import numpy as np
 import google.generativeai as genai
-import ffmpeg # New import
 import time
 import hashlib
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: cache locking degrades to best-effort
 from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Tag baked into cache paths so entries keyed with one hash algorithm are
+# never confused with entries keyed with another.
+CACHE_HASH_VERSION = 'b3' if blake3 is not None else 'sha256'
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # --- CONFIGURE GEMINI API ---
@@ -25,11 +56,183 @@ except ValueError as e:
     logging.warning(f"Gemini API not configured: {e}")
     gemini_api_key = None
 
+# --- WHISPER MODEL (loaded once per process) ---
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL_NAME", "small")
+# Optional overrides; by default the device is auto-detected and the
+# quantization picked to match it (see _whisper_device_and_compute_type).
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE")
+_WHISPER_MODEL = None
+_WHISPER_LOCK = threading.Lock()
+
+def _whisper_device_and_compute_type():
+    """Pick (device, compute_type) for the Whisper model.
+
+    Transcription is dense transformer matmuls, so a GPU is by far the
+    largest lever; CTranslate2 (faster-whisper's backend) ships CUDA
+    support, so probe it directly instead of depending on torch. On CUDA,
+    int8_float16 runs the matmuls in FP16 with int8 weights; on CPU plain
+    int8 is the right default."""
+    device = WHISPER_DEVICE
+    if not device:
+        device = "cpu"
+        try:
+            import ctranslate2
+            if ctranslate2.get_cuda_device_count() > 0:
+                device = "cuda"
+        except Exception as e:
+            logging.warning(f"Could not probe CUDA devices: {e}")
+    compute_type = WHISPER_COMPUTE_TYPE
+    if not compute_type:
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+    return device, compute_type
+
+def get_whisper_model(name=None):
+    """Return the process-wide Whisper model, loading it on first use.
+
+    Loading 'small' reads ~500 MB of weights from disk, so the model is a
+    lazy singleton shared by every task handled by this process. The lock
+    guards concurrent first use from the per-upload pipeline threads.
+    """
+    global _WHISPER_MODEL
+    if name is None:
+        name = WHISPER_MODEL_NAME
+    if _WHISPER_MODEL is None:
+        with _WHISPER_LOCK:
+            if _WHISPER_MODEL is None:
+                device, compute_type = _whisper_device_and_compute_type()
+                logging.info(f"Loading Whisper model '{name}' (CTranslate2, "
+                             f"device={device}, {compute_type})...")
+                _WHISPER_MODEL = WhisperModel(name, device=device,
+                                              compute_type=compute_type)
+    return _WHISPER_MODEL
+
+def _transcribe_worker_count():
+    """TRANSCRIBE_WORKERS > 1 turns on split-and-map transcription of long
+    audio (see _transcribe_audio_parallel); default keeps one decode."""
+    try:
+        return max(1, int(os.environ['TRANSCRIBE_WORKERS']))
+    except (KeyError, ValueError):
+        return 1
+
+def _whisper_batch_size():
+    """Batch size for chunked transcription; WHISPER_BATCH_SIZE overrides,
+    0 disables batching entirely."""
+    try:
+        return int(os.environ['WHISPER_BATCH_SIZE'])
+    except (KeyError, ValueError):
+        return 8
+
+# WHISPER_PRELOAD=1 pays the model load at process start instead of on the
+# first upload, so no request ever sees the cold-start pause. Off by default:
+# management commands importing pipeline.py shouldn't pull in the weights.
+if os.getenv("WHISPER_PRELOAD") == "1":
+    get_whisper_model()
+
+# --- HARDWARE ENCODER DETECTION ---
+# Preference order plus encoder-appropriate rate-control options; entries are
+# only used after an encoder is listed by ffmpeg AND passes a one-frame smoke
+# test (catches driver/toolkit mismatches).
+_HW_ENCODER_CANDIDATES = [
+    ('h264_nvenc', {'preset': 'p4', 'rc': 'vbr', 'cq': 23}),
+    ('h264_qsv', {'global_quality': 23}),
+    ('h264_videotoolbox', {}),
+    ('h264_vaapi', {}),
+]
+_HW_ENCODER = None
+_HW_ENCODER_PROBED = False
+_HW_ENCODER_LOCK = threading.Lock()
+
+def _smoke_test_encoder(encoder):
+    """Encode one synthetic frame to verify the encoder actually works."""
+    try:
+        subprocess.run(
+            ['ffmpeg', '-hide_banner', '-f', 'lavfi',
+             '-i', 'color=black:size=320x240:duration=0.1',
+             '-frames:v', '1', '-c:v', encoder, '-f', 'null', '-'],
+            check=True, capture_output=True, timeout=30)
+        return True
+    except Exception:
+        return False
+
+def get_hw_encoder():
+    """Return (encoder_name, extra_output_args) for the first working
+    hardware H.264 encoder, or (None, {}) when only libx264 is available."""
+    global _HW_ENCODER, _HW_ENCODER_PROBED
+    if not _HW_ENCODER_PROBED:
+        with _HW_ENCODER_LOCK:
+            if not _HW_ENCODER_PROBED:
+                try:
+                    listing = subprocess.run(
+                        ['ffmpeg', '-hide_banner', '-encoders'],
+                        capture_output=True, text=True, check=True).stdout
+                except Exception as e:
+                    logging.warning(f"Could not list ffmpeg encoders: {e}")
+                    listing = ""
+                for encoder, options in _HW_ENCODER_CANDIDATES:
+                    if encoder in listing and _smoke_test_encoder(encoder):
+                        logging.info(f"Using hardware encoder: {encoder}")
+                        _HW_ENCODER = (encoder, options)
+                        break
+                _HW_ENCODER_PROBED = True
+    return _HW_ENCODER if _HW_ENCODER else (None, {})
+
+def _video_encode_argv():
+    """Output arguments for the re-encode paths: hardware encoder when one
+    is available, libx264 otherwise."""
+    encoder, options = get_hw_encoder()
+    if encoder is None:
+        return ['-c:v', 'libx264', '-b:v', '5M',
+                '-preset', 'ultrafast', '-tune', 'fastdecode']
+    argv = ['-c:v', encoder, '-b:v', '5M']
+    for key, value in options.items():
+        argv += [f'-{key}', str(value)]
+    return argv
+
+def _escape_drawtext(text):
+    """Escape text for a single-quoted drawtext value.
+
+    Inside ffmpeg single quotes nothing is special — including backslashes —
+    so the only character needing care is the quote itself, spliced
+    shell-style: close the quoted run, emit an escaped quote, reopen."""
+    return text.replace("'", r"'\''")
+
+def _drawtext_filter(text, box_color, enable):
+    # expansion=none keeps %{...} sequences in event text literal instead of
+    # triggering drawtext's text expansion.
+    return (f"drawtext=text='{_escape_drawtext(text)}':expansion=none:fontsize=90:"
+            f"fontcolor=white:box=1:boxcolor={box_color}:boxborderw=10:"
+            f"x=(w-text_w)/2:y=(h-text_h)/2:enable='{enable}'")
+
+# Explicit thread count: several ffmpeg builds default to one decode thread,
+# and the decode side dominates the stream-copy commands. Placed before -i so
+# it applies to the input (demux/decode) as well as the encoder.
+_FFMPEG_THREADS = ['-threads', str(os.cpu_count() or 4)]
+
+def _run_ffmpeg(cmd):
+    """Run an ffmpeg argv, raising CalledProcessError (with stderr) on failure."""
+    start = time.time()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    logging.debug(f"ffmpeg finished in {time.time() - start:.2f}s: {cmd[-1]}")
+
 # --- HELPER FUNCTION FOR TIME CONVERSION ---
+@lru_cache(maxsize=1024)
 def time_to_seconds(time_str): # Renamed from time_str_to_seconds
-    """Converts a 'hh:mm:ss' string to total seconds."""
-    h, m, s = map(int, time_str.split(':'))
-    return h * 3600 + m * 60 + s
+    """Converts a 'hh:mm:ss' string to total seconds. Memoized: the same
+    stamps recur across parsing, clipping, and rendering."""
+    h, m, s = time_str.split(':')
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+def _event_window_seconds(event):
+    """(start, end) of an event in seconds. Uses the values precomputed at
+    parse time, with a fallback for events.json files written before the
+    seconds were stored."""
+    start_seconds = event.get('start_seconds')
+    end_seconds = event.get('end_seconds')
+    if start_seconds is None or end_seconds is None:
+        start_seconds = time_to_seconds(event['start_timestamp'])
+        end_seconds = time_to_seconds(event['end_timestamp'])
+    return start_seconds, end_seconds
 
 # --- NEW HELPER FUNCTION FOR OVERLAYS ---
 def get_event_overlay_config(event_data_for_overlay):
@@ -64,12 +267,23 @@ def get_event_overlay_config(event_data_for_overlay):
     config = overlay_configs.get(event_data_for_overlay['type'], default_config)
     return config['text'], config['box_color']
 
-# --- STAGE 1 & 2 (Unchanged) ---
-def extract_audio(video_path, task_id):
+# --- STAGE 1 & 2 ---
+# 16 kHz mono s16le is exactly what Whisper resamples to internally, so
+# extracting in this format skips a second resample pass and shrinks the
+# intermediate file ~6x versus the source-rate output.
+WHISPER_SAMPLE_RATE = 16000
+_AUDIO_FORMAT_ARGS = ["-vn", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE),
+                      "-c:a", "pcm_s16le"]
+
+def extract_audio(video_path, task_id, out_path=None):
     logging.info(f"[{task_id}] Starting audio extraction...")
-    task_dir = os.path.dirname(video_path)
-    audio_path = os.path.join(task_dir, "audio.wav")
-    command = ["ffmpeg", "-i", video_path, "-q:a", "0", "-map", "a", "-y", audio_path]
+    if out_path is not None:
+        audio_path = out_path
+    else:
+        task_dir = os.path.dirname(video_path)
+        audio_path = os.path.join(task_dir, "audio.wav")
+    command = (["ffmpeg"] + _FFMPEG_THREADS + ["-i", video_path]
+               + _AUDIO_FORMAT_ARGS + ["-y", audio_path])
     try:
         subprocess.run(command, check=True, capture_output=True, text=True)
         logging.info(f"[{task_id}] Audio extracted successfully.")
@@ -78,37 +292,225 @@ def extract_audio(video_path, task_id):
         logging.error(f"[{task_id}] Audio extraction failed: {e}")
         return None
 
-def transcribe_audio(audio_path, task_id):
+# Content-addressed transcript cache, independent of uploads/: keyed by the
+# audio bytes and model name, so the same audio track embedded in a different
+# container (or a wiped uploads/ dir) never triggers a re-transcription.
+TRANSCRIPT_CACHE_DIR = os.path.expanduser(
+    os.path.join('~', '.cache', 'video-summarizer', 'transcripts'))
+
+def _transcript_cache_path(audio_path, model_name):
+    hasher = new_file_hasher()
+    hasher.update(model_name.encode('utf-8'))
+    with open(audio_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(block)
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{hasher.hexdigest()}.json")
+
+def _load_cached_transcript(cache_path, task_id):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            envelope = json.load(f)
+        if 'segments' in envelope and 'text' in envelope:
+            logging.info(f"[{task_id}] [CACHE] Reusing transcript from {cache_path}.")
+            return envelope
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        # Corrupt entries just degrade to re-transcription.
+        logging.warning(f"[{task_id}] Ignoring unreadable transcript cache entry {cache_path}: {e}")
+    return None
+
+def _store_cached_transcript(cache_path, model_name, segments, full_text, task_id):
+    try:
+        os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_dump_json_bytes(
+                {'model': model_name, 'segments': segments, 'text': full_text}))
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logging.warning(f"[{task_id}] Could not write transcript cache entry: {e}")
+
+def _dump_json_bytes(obj):
+    """Serialize machine-read JSON (no human ever opens transcript.json in
+    the hot path): orjson when installed — several times faster and emits
+    bytes directly — compact stdlib json otherwise. Either way no indent,
+    which also shrinks the file ~3x."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _load_audio_array(audio_path):
+    """Load the 16 kHz mono s16le WAV written by extract_audio straight into
+    the float32 array faster-whisper consumes. frombuffer + one scale pass
+    replaces the model's own PyAV demux/decode of the file, and the bytes
+    are already hot in the page cache from the transcript-cache hash.
+    Returns None for any other format (caller falls back to the path)."""
+    try:
+        with wave.open(audio_path, 'rb') as wav:
+            if (wav.getnchannels() != 1 or wav.getsampwidth() != 2
+                    or wav.getframerate() != WHISPER_SAMPLE_RATE):
+                return None
+            frames = wav.readframes(wav.getnframes())
+        return np.frombuffer(frames, np.int16).astype(np.float32) / 32768.0
+    except Exception:
+        return None
+
+def _split_audio(audio_path, chunk_seconds=300):
+    """Split a WAV into ~chunk_seconds pieces with ffmpeg's segment muxer
+    (stream copy, so this is pure I/O). Returns the chunk paths in order."""
+    chunk_dir = audio_path + '.chunks'
+    os.makedirs(chunk_dir, exist_ok=True)
+    pattern = os.path.join(chunk_dir, 'chunk_%03d.wav')
+    subprocess.run(['ffmpeg', '-i', audio_path, '-f', 'segment',
+                    '-segment_time', str(chunk_seconds), '-c', 'copy', '-y', pattern],
+                   check=True, capture_output=True)
+    return sorted(os.path.join(chunk_dir, name)
+                  for name in os.listdir(chunk_dir) if name.endswith('.wav'))
+
+def _transcribe_audio_parallel(model, audio_path, workers, task_id,
+                               chunk_seconds=300):
+    """Transcribe long audio as concurrently decoded chunks.
+
+    CTranslate2 releases the GIL during inference, so a thread pool overlaps
+    the decoders across cores (or across requests sharing a GPU). Each
+    chunk's segments are shifted by its offset before the lists are merged
+    back in order. Cuts can land mid-word at chunk boundaries, which is why
+    this stays opt-in via TRANSCRIBE_WORKERS."""
+    chunk_paths = _split_audio(audio_path, chunk_seconds)
+    logging.info(f"[{task_id}] Transcribing {len(chunk_paths)} audio chunks "
+                 f"with {workers} workers...")
+
+    def transcribe_one(chunk_path):
+        segments_iter, info = model.transcribe(chunk_path, beam_size=1, vad_filter=True)
+        return [{"start": seg.start, "end": seg.end, "text": seg.text}
+                for seg in segments_iter]
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            per_chunk = list(executor.map(transcribe_one, chunk_paths))
+    finally:
+        shutil.rmtree(os.path.dirname(chunk_paths[0]), ignore_errors=True)
+
+    segments = []
+    for i, chunk_segments in enumerate(per_chunk):
+        offset = i * chunk_seconds
+        for seg in chunk_segments:
+            segments.append({"start": seg["start"] + offset,
+                             "end": seg["end"] + offset,
+                             "text": seg["text"]})
+    return segments
+
+def transcribe_audio(audio_path, task_id, out_txt=None, out_json=None):
     logging.info(f"[{task_id}] Starting transcription...")
     try:
-        logging.info(f"[{task_id}] Loading Whisper model 'small'...")
-        model = whisper.load_model("small")
-        logging.info(f"[{task_id}] Transcribing audio...")
-        result = model.transcribe(audio_path, fp16=False)
-        task_dir = os.path.dirname(audio_path)
-        txt_path = os.path.join(task_dir, "transcript.txt")
-        json_path = os.path.join(task_dir, "transcript.json")
+        cache_path = None
+        if os.getenv("DISABLE_TRANSCRIPT_CACHE") != "1":
+            cache_path = _transcript_cache_path(audio_path, WHISPER_MODEL_NAME)
+
+        segments = None
+        full_text = None
+        if cache_path:
+            cached = _load_cached_transcript(cache_path, task_id)
+            if cached is not None:
+                segments = cached['segments']
+                full_text = cached['text']
+
+        if segments is None:
+            model = get_whisper_model()
+            logging.info(f"[{task_id}] Transcribing audio...")
+            # faster-whisper returns a lazy segment generator; materialize it into
+            # the same {'start','end','text'} dicts the downstream stages expect.
+            # vad_filter skips silent stretches so the decoder does less work.
+            # Long recordings decode one 30s window at a time; the batched
+            # pipeline tiles several windows per forward pass instead, which
+            # is a large win on GPU and still helps multi-core CPU.
+            workers = _transcribe_worker_count()
+            batch_size = _whisper_batch_size()
+            if workers > 1:
+                segments = _transcribe_audio_parallel(model, audio_path, workers, task_id)
+            else:
+                audio_input = _load_audio_array(audio_path)
+                if audio_input is None:
+                    audio_input = audio_path
+                if BatchedInferencePipeline is not None and batch_size > 1:
+                    segments_iter, info = BatchedInferencePipeline(model=model).transcribe(
+                        audio_input, beam_size=1, vad_filter=True, batch_size=batch_size)
+                else:
+                    segments_iter, info = model.transcribe(audio_input, beam_size=1, vad_filter=True)
+                segments = [{"start": seg.start, "end": seg.end, "text": seg.text}
+                            for seg in segments_iter]
+            full_text = "".join(seg["text"] for seg in segments)
+            if cache_path:
+                _store_cached_transcript(cache_path, WHISPER_MODEL_NAME,
+                                         segments, full_text, task_id)
+
+        out_dir = os.path.dirname(audio_path)
+        txt_path = out_txt or os.path.join(out_dir, "transcript.txt")
+        json_path = out_json or os.path.join(out_dir, "transcript.json")
         with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write(result["text"])
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result["segments"], f, indent=2, ensure_ascii=False)
+            f.write(full_text)
+        with open(json_path, 'wb') as f:
+            f.write(_dump_json_bytes(segments))
         logging.info(f"[{task_id}] Transcription complete.")
-        return txt_path, json_path
+        return txt_path, json_path, segments
     except Exception as e:
         logging.error(f"[{task_id}] An error occurred during transcription: {e}")
-        return None, None
+        return None, None, None
+
+def _format_timestamp(seconds):
+    """Format seconds as h:mm:ss. Integer divmod plus an f-string is far
+    cheaper than allocating a datetime.timedelta per segment for its
+    __str__."""
+    h, rem = divmod(int(seconds), 3600)
+    m, s = divmod(rem, 60)
+    return f"{h:d}:{m:02d}:{s:02d}"
+
+# Whisper emits segments of a few words each; a 90-minute match would send
+# thousands of near-duplicate '[h:mm:ss] two words' lines to Gemini. Adjacent
+# segments are coalesced into paragraphs keyed by one timestamp, which cuts
+# the prompt tokens (and so LLM latency and cost) several-fold without losing
+# the time resolution the clipper needs.
+TRANSCRIPT_BUCKET_S = 30
+TRANSCRIPT_BUCKET_CHARS = 500
 
-def format_transcript_with_timestamps(json_path):
+def format_transcript_with_timestamps(segments_or_path):
+    """Render segments as the timestamped text sent to the LLM.
+
+    Accepts either the in-memory segment list (a fresh transcription in the
+    same process — no reason to round-trip tens of MB of JSON through disk)
+    or a path to transcript.json for cache hits and external callers."""
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            segments = json.load(f)
-        formatted_lines = []
+        if isinstance(segments_or_path, (str, os.PathLike)):
+            with open(segments_or_path, 'rb') as f:
+                segments = json.loads(f.read())
+        else:
+            segments = segments_or_path
+        # One (timestamp, [texts]) pair per paragraph; the strings are only
+        # joined once, in the final generator fed to "\n".join.
+        buckets = []
+        bucket_start = None
+        buffer = []
+        buffer_len = 0
         for segment in segments:
-            start_time_seconds = int(segment['start'])
-            timestamp = str(datetime.timedelta(seconds=start_time_seconds))
             text = segment['text'].strip()
-            formatted_lines.append(f"[{timestamp}] {text}")
-        return "\n".join(formatted_lines)
+            if len(text) < 3:
+                continue  # filler snippets ("Uh") cost tokens, carry no signal
+            if bucket_start is not None and (
+                    segment['start'] - bucket_start >= TRANSCRIPT_BUCKET_S
+                    or buffer_len > TRANSCRIPT_BUCKET_CHARS):
+                buckets.append((bucket_start, buffer))
+                bucket_start = None
+                buffer = []
+                buffer_len = 0
+            if bucket_start is None:
+                bucket_start = segment['start']
+            buffer.append(text)
+            buffer_len += len(text) + 1
+        if buffer:
+            buckets.append((bucket_start, buffer))
+        return "\n".join(f"[{_format_timestamp(start)}] {' '.join(texts)}"
+                         for start, texts in buckets)
     except Exception as e:
         logging.error(f"Failed to format transcript with timestamps: {e}")
         return None
@@ -122,84 +524,411 @@ def extract_events_with_llm(formatted_transcript, task_id):
         return None
 
     try:
-        # The new, detailed prompt provided by the user
-        prompt = f"""
-```
-Extract all instances of the following events from the provided match transcript or commentary, and return *only* the output in the format specified below. Do not include any explanatory text, metadata, or commentary outside the specified format.
+        return list(iter_events_from_llm(formatted_transcript, task_id))
+    except Exception as e:
+        logging.error(f"[{task_id}] An error occurred during LLM event extraction: {e}")
+        return None
+
+# Structured output: the model fills this schema directly instead of emitting
+# a custom `[ts] - [ts] - ...` text format that had to be split per line (and
+# silently dropped events whose descriptions contained ' - ').
+EVENT_TYPES = ['goal', 'foul', 'replacement', 'missed goal', 'prologue', 'epilogue']
+EVENT_FIELDS = ['start_timestamp', 'end_timestamp', 'team', 'event_type', 'description']
+_EVENT_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {
+                'start_timestamp': {'type': 'string'},
+                'end_timestamp': {'type': 'string'},
+                'team': {'type': 'string'},
+                'event_type': {'type': 'string', 'enum': EVENT_TYPES},
+                'description': {'type': 'string'},
+            },
+            'required': EVENT_FIELDS,
+        },
+    },
+}
+
+# Shared Gemini model handle: constructing GenerativeModel re-reads config
+# and transport state, and a single client keeps the underlying HTTP
+# connection pool warm across calls (genai clients are concurrency-safe).
+_GEMINI_MODEL = None
+_GEMINI_LOCK = threading.Lock()
+
+def _get_gemini_model():
+    global _GEMINI_MODEL
+    if _GEMINI_MODEL is None:
+        with _GEMINI_LOCK:
+            if _GEMINI_MODEL is None:
+                _GEMINI_MODEL = genai.GenerativeModel(
+                    'gemini-1.5-flash', generation_config=_EVENT_GENERATION_CONFIG)
+    return _GEMINI_MODEL
+
+def _build_event_prompt(formatted_transcript):
+    # The detailed prompt provided by the user, adapted for structured JSON output
+    return f"""
+Extract all instances of the following events from the provided match transcript or commentary.
 
 **Events to Extract:**
-- **Goal** – When a goal is scored (including penalties, free kicks, own goals)
-- **Foul** – When a foul is committed (including yellow/red card incidents)
-- **Replacement** – When a player substitution occurs
-- **Missed Goal** – When a clear scoring opportunity is missed (shots wide, saved, hit post/crossbar)
-- **Prologue** – Beginning of match coverage (team introductions, formations, toss, pre-match analysis)
-- **Epilogue** – End of match coverage (final whistle, winner declaration, celebrations, post-match analysis)
+- **goal** – When a goal is scored (including penalties, free kicks, own goals)
+- **foul** – When a foul is committed (including yellow/red card incidents)
+- **replacement** – When a player substitution occurs
+- **missed goal** – When a clear scoring opportunity is missed (shots wide, saved, hit post/crossbar)
+- **prologue** – Beginning of match coverage (team introductions, formations, toss, pre-match analysis)
+- **epilogue** – End of match coverage (final whistle, winner declaration, celebrations, post-match analysis)
 
 **Timestamp Rules:**
-- **Start timestamp** must be the earlier of:
+- **start_timestamp** must be the earlier of:
   - 8 seconds before the actual event occurs, OR
   - The beginning of meaningful build-up play that provides relevant context
-- **End timestamp** must extend until all related context concludes, including:
+- **end_timestamp** must extend until all related context concludes, including:
   - Goal celebrations and replays
   - VAR reviews and decisions
   - Arguments or protests
   - Substitution processes
   - Commentary aftermath and analysis
 
-**Output Format:**
-Return each event as a single line using this exact format:
-```
-[start timestamp] - [end timestamp] - [team name] - [type] - [short description]
-```
-
-**Format Requirements:**
+**Field Requirements:**
 - Timestamps in **hh:mm:ss** format
-- Team name: Use actual team names (e.g., "Argentina", "France") or "N/A" for neutral events
-- Type: Exactly one of: "goal", "foul", "replacement", "missed goal", "prologue", "epilogue"
-- Description: Brief, meaningful phrase (e.g., "Header Goal by Messi", "Foul on Mbappé", "Substitution: Benzema OUT, Giroud IN")
+- team: Use actual team names (e.g., "Argentina", "France") or "N/A" for neutral events
+- event_type: Exactly one of: "goal", "foul", "replacement", "missed goal", "prologue", "epilogue"
+- description: Brief, meaningful phrase (e.g., "Header Goal by Messi", "Foul on Mbappé", "Substitution: Benzema OUT, Giroud IN")
 
-```
 --- TRANSCRIPT BEGINS ---
 {formatted_transcript}
 --- TRANSCRIPT ENDS ---
 """
-        logging.info(f"[{task_id}] Sending transcript to Gemini model for detailed analysis...")
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        
-        # --- NEW PARSING LOGIC ---
-        events = []
-        for line in response.text.strip().split('\n'):
-            line = line.strip()
-            if not line:
+
+def _iter_streamed_events(response, task_id):
+    """Incrementally decode event objects out of a streamed JSON array, so
+    complete events are available before the closing bracket arrives."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    in_array = False
+    for chunk in response:
+        buffer += chunk.text
+        while True:
+            buffer = buffer.lstrip()
+            if not in_array:
+                if buffer.startswith('['):
+                    buffer = buffer[1:]
+                    in_array = True
+                    continue
+                break  # wait for the opening bracket
+            if buffer.startswith(','):
+                buffer = buffer[1:]
                 continue
+            if not buffer or buffer.startswith(']'):
+                break
             try:
-                # Split the line into the 5 expected parts
-                parts = line.split(' - ', 4)
-                if len(parts) == 5:
-                    start_ts, end_ts, team, event_type, desc = parts
-                    events.append({
-                        "start_timestamp": start_ts.strip('[] '),
-                        "end_timestamp": end_ts.strip('[] '),
-                        "team": team,
-                        "event_type": event_type,
-                        "description": desc
-                    })
-                else:
-                    logging.warning(f"[{task_id}] Skipping malformed line from LLM: {line}")
-            except Exception as e:
-                logging.error(f"[{task_id}] Error parsing line '{line}': {e}")
+                obj, end = decoder.raw_decode(buffer)
+            except ValueError:
+                break  # object still incomplete; wait for more chunks
+            buffer = buffer[end:]
+            yield obj
+
+def _normalize_event(obj, task_id):
+    """Validate one event object from the LLM; returns it or None.
+
+    Also converts the timestamps once and stores start_seconds/end_seconds
+    on the event, so later stages never re-parse the strings."""
+    if (isinstance(obj, dict) and all(field in obj for field in EVENT_FIELDS)
+            and obj['event_type'] in EVENT_TYPES):
+        try:
+            obj['start_seconds'] = time_to_seconds(obj['start_timestamp'])
+            obj['end_seconds'] = time_to_seconds(obj['end_timestamp'])
+            return obj
+        except ValueError:
+            pass
+    logging.warning(f"[{task_id}] Skipping malformed event object from LLM: {obj}")
+    return None
 
-        logging.info(f"[{task_id}] Successfully parsed {len(events)} events from LLM response.")
-        return events
+# Long transcripts are split into overlapping time windows and dispatched to
+# Gemini concurrently; the overlap catches events straddling a boundary and
+# the dedupe below removes the resulting doubles.
+TRANSCRIPT_WINDOW_S = 600
+TRANSCRIPT_OVERLAP_S = 30
+
+def split_transcript_by_time(formatted_transcript, window_s=TRANSCRIPT_WINDOW_S,
+                             overlap_s=TRANSCRIPT_OVERLAP_S):
+    """Split a '[h:mm:ss] text' transcript into overlapping time windows.
+
+    Returns the whole transcript as a single chunk when it fits in one
+    window."""
+    timed_lines = []
+    last_seconds = 0
+    for line in formatted_transcript.split('\n'):
+        seconds = None
+        if line.startswith('['):
+            try:
+                seconds = time_to_seconds(line[1:line.index(']')])
+            except (ValueError, IndexError):
+                seconds = None
+        if seconds is None:
+            seconds = last_seconds
+        last_seconds = seconds
+        timed_lines.append((seconds, line))
+    if not timed_lines:
+        return []
+    total = timed_lines[-1][0]
+    if total < window_s:
+        return [formatted_transcript]
+    chunks = []
+    window_start = 0
+    while window_start <= total:
+        window_lines = [line for seconds, line in timed_lines
+                        if window_start - overlap_s <= seconds < window_start + window_s]
+        if window_lines:
+            chunks.append('\n'.join(window_lines))
+        window_start += window_s
+    return chunks
 
+def _event_start_seconds(event):
+    try:
+        return _event_window_seconds(event)[0]
+    except Exception:
+        return 0
+
+def _dedupe_events(events):
+    """Merge events from overlapping windows: same (start, type) counts as
+    one event; output stays sorted by start time."""
+    seen = set()
+    deduped = []
+    for event in sorted(events, key=_event_start_seconds):
+        key = (_event_start_seconds(event), event['event_type'])
+        if key in seen:
+            continue
+        seen.add(key)
+        deduped.append(event)
+    return deduped
+
+async def _extract_events_chunked_async(chunks, task_id):
+    model = _get_gemini_model()
+    responses = await asyncio.gather(
+        *[model.generate_content_async(_build_event_prompt(chunk)) for chunk in chunks],
+        return_exceptions=True)
+    events = []
+    for idx, response in enumerate(responses):
+        if isinstance(response, Exception):
+            logging.error(f"[{task_id}] Event extraction failed for chunk {idx + 1}/{len(chunks)}: {response}")
+            continue
+        try:
+            objs = json.loads(response.text)
+        except ValueError as e:
+            logging.error(f"[{task_id}] Could not parse events from chunk {idx + 1}/{len(chunks)}: {e}")
+            continue
+        for obj in objs:
+            event = _normalize_event(obj, task_id)
+            if event:
+                events.append(event)
+    return events
+
+def iter_events_from_llm(formatted_transcript, task_id):
+    """Streams the Gemini response and yields events as they are decoded.
+
+    Streaming lets the caller start CPU-bound work (clip encoding) on early
+    events while the model is still emitting later ones. Transcripts longer
+    than one window are instead fanned out to Gemini concurrently, chunk per
+    request, so stage 3 costs roughly one chunk's latency rather than the
+    sum.
+    """
+    if not gemini_api_key:
+        logging.error(f"[{task_id}] Cannot proceed: GEMINI_API_KEY not configured.")
+        return
+
+    chunks = split_transcript_by_time(formatted_transcript)
+    if len(chunks) > 1:
+        logging.info(f"[{task_id}] Long transcript: dispatching {len(chunks)} overlapping windows to Gemini concurrently.")
+        events = asyncio.run(_extract_events_chunked_async(chunks, task_id))
+        parsed = 0
+        for event in _dedupe_events(events):
+            parsed += 1
+            yield event
+        logging.info(f"[{task_id}] Successfully parsed {parsed} events from {len(chunks)} LLM responses.")
+        return
+
+    prompt = _build_event_prompt(formatted_transcript)
+    logging.info(f"[{task_id}] Sending transcript to Gemini model for detailed analysis...")
+    model = _get_gemini_model()
+    response = model.generate_content(prompt, stream=True)
+
+    parsed = 0
+    for obj in _iter_streamed_events(response, task_id):
+        event = _normalize_event(obj, task_id)
+        if event:
+            parsed += 1
+            yield event
+    logging.info(f"[{task_id}] Successfully parsed {parsed} events from LLM response.")
+
+# --- STAGE 4: VIDEO CLIPPING (UPDATED TO USE START/END TIMESTAMPS AND OVERLAYS) ---
+def _clip_worker_count():
+    """Worker count for parallel clip encoding. Each ffmpeg process is itself
+    multi-threaded, so default to half the cores (min 2); CLIP_WORKERS
+    overrides."""
+    try:
+        return max(1, int(os.environ['CLIP_WORKERS']))
+    except (KeyError, ValueError):
+        return max(2, (os.cpu_count() or 2) // 2)
+
+# Set CLIP_REENCODE=1 to force the old frame-accurate libx264 path with the
+# overlay baked into each clip. The default stream-copies each clip (cuts
+# snap to the nearest keyframe, which the 8-second pre-roll rule absorbs)
+# and leaves the overlays for the single encode pass in stitch_clips.
+def _clip_reencode_enabled():
+    return os.getenv('CLIP_REENCODE') == '1'
+
+def _overlay_for_event(event):
+    """Build the (text, box_color) overlay pair for an event dict."""
+    return get_event_overlay_config({
+        'type': event['event_type'].capitalize(), # e.g., "Goal", "Foul", "Missed goal"
+        'team_name': event['team'],
+        'description': event['description']
+    })
+
+@lru_cache(maxsize=8)
+def _keyframe_times(video_path):
+    """Sorted keyframe timestamps of the first video stream, from a single
+    ffprobe packet scan. Stream-copy cuts can only start on a keyframe, so
+    the clip paths snap their -ss values to these; one scan is shared by
+    every clip of the same source. Empty tuple when probing fails."""
+    try:
+        out = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path],
+            capture_output=True, text=True, check=True).stdout
     except Exception as e:
-        logging.error(f"[{task_id}] An error occurred during LLM event extraction: {e}")
-        if 'response' in locals():
-            logging.error(f"[{task_id}] Raw LLM response: {response.text}")
+        logging.warning(f"Could not probe keyframes of {video_path}: {e}")
+        return ()
+    times = []
+    for line in out.splitlines():
+        parts = line.split(',')
+        if len(parts) >= 2 and 'K' in parts[1]:
+            try:
+                times.append(float(parts[0]))
+            except ValueError:
+                pass
+    times.sort()
+    return tuple(times)
+
+def _snap_to_keyframe(video_path, start_seconds):
+    """Largest keyframe timestamp <= start_seconds, or start_seconds when no
+    keyframe data is available. Snapping backwards means the clip always
+    opens on a decodable frame instead of a gap until the next keyframe."""
+    keyframes = _keyframe_times(video_path)
+    if not keyframes:
+        return start_seconds
+    index = bisect.bisect_right(keyframes, start_seconds) - 1
+    if index < 0:
+        return start_seconds
+    return keyframes[index]
+
+def build_clip_cmd(video_path, start_seconds, duration, clip_path, overlay=None):
+    """Build the ffmpeg argv for cutting one clip.
+
+    `-ss` sits before `-i` for fast input seeking. With `overlay=(text,
+    box_color)` the clip is re-encoded with the drawtext baked in; otherwise
+    it is a pure stream copy.
+    """
+    cmd = (['ffmpeg'] + _FFMPEG_THREADS
+           + ['-ss', str(start_seconds), '-i', video_path, '-t', str(duration)])
+    if overlay is not None:
+        text_overlay, box_color_overlay = overlay
+        cmd += ['-vf', _drawtext_filter(text_overlay, box_color_overlay, 'between(t,0,2)')]
+        cmd += _video_encode_argv()
+        cmd += ['-c:a', 'copy']
+    else:
+        # Stream copy: no decode/encode at all, just container rewriting.
+        cmd += ['-c', 'copy', '-avoid_negative_ts', 'make_zero']
+    cmd += ['-movflags', 'faststart', '-y', clip_path]
+    return cmd
+
+def _encode_one_clip(i, event, video_path, clips_dir, task_id):
+    """Cut a single event clip; returns the clip path, or None on failure.
+
+    Runs inside the clip worker pool, so all errors are logged here rather
+    than raised."""
+    try:
+        start_seconds, end_seconds = _event_window_seconds(event)
+        duration = end_seconds - start_seconds
+
+        if duration <= 0:
+            logging.warning(f"[{task_id}] Skipping event with invalid duration (<=0s): {event['event_type']} from {event['start_timestamp']} to {event['end_timestamp']}")
+            return None
+
+        # Sanitize event_type for filename
+        filename_event_type = event['event_type'].replace(' ', '_').lower()
+        clip_filename = f"clip_{i+1}_{filename_event_type}.mp4"
+        clip_path = os.path.join(clips_dir, clip_filename)
+
+        logging.info(f"[{task_id}] Creating clip {i+1}: {clip_filename} ({event['event_type']}) from {start_seconds}s for {duration}s")
+
+        overlay = _overlay_for_event(event) if _clip_reencode_enabled() else None
+        if overlay is None:
+            # Stream copy: pull the cut back to the preceding keyframe (and
+            # stretch the duration to match) so the clip never opens with
+            # undecodable frames, or empty when no keyframe followed -ss.
+            snapped = _snap_to_keyframe(video_path, start_seconds)
+            duration += start_seconds - snapped
+            start_seconds = snapped
+        _run_ffmpeg(build_clip_cmd(video_path, start_seconds, duration, clip_path, overlay))
+        logging.info(f"[{task_id}] Successfully created clip: {clip_path}")
+        return clip_path
+
+    except subprocess.CalledProcessError as e:
+        stderr_decoded = e.stderr.decode('utf-8', errors='replace') if e.stderr else "Unknown FFmpeg error"
+        logging.error(f"[{task_id}] FFmpeg error creating clip for event {i+1} ({event.get('event_type', 'N/A')}): {stderr_decoded}")
+        return None
+    except Exception as e:
+        logging.error(f"[{task_id}] Failed to create clip for event {i+1} ({event.get('event_type', 'N/A')}). Error: {e}", exc_info=True)
+        return None
+
+# CLIP_SINGLE_PROCESS=1 cuts every clip in one ffmpeg run instead of one
+# process per event (stream-copy mode only).
+def _clip_single_process_enabled():
+    return os.getenv('CLIP_SINGLE_PROCESS') == '1'
+
+def _create_clips_single_process(events, video_path, clips_dir, task_id):
+    """Cut all event clips with a single ffmpeg invocation.
+
+    One input feeding N `-ss/-t -c copy` output groups: the source is
+    demuxed once and each output keeps only the packets inside its window,
+    which drops the N-1 process cold starts and handles overlapping windows
+    (unlike the segment muxer). The trade-off is one sequential read of the
+    whole file instead of N fast seeks, so it pays off when events cover
+    much of the video. Returns the clip paths, or None so the caller can
+    fall back to the per-clip pool.
+    """
+    cmd = ['ffmpeg'] + _FFMPEG_THREADS + ['-i', video_path]
+    clip_paths = []
+    for i, event in enumerate(events):
+        start_seconds, end_seconds = _event_window_seconds(event)
+        duration = end_seconds - start_seconds
+        if duration <= 0:
+            logging.warning(f"[{task_id}] Skipping event with invalid duration (<=0s): {event['event_type']} from {event['start_timestamp']} to {event['end_timestamp']}")
+            continue
+        filename_event_type = event['event_type'].replace(' ', '_').lower()
+        clip_path = os.path.join(clips_dir, f"clip_{i+1}_{filename_event_type}.mp4")
+        snapped = _snap_to_keyframe(video_path, start_seconds)
+        duration += start_seconds - snapped
+        start_seconds = snapped
+        cmd += ['-ss', str(start_seconds), '-t', str(duration), '-c', 'copy',
+                '-avoid_negative_ts', 'make_zero', '-movflags', 'faststart',
+                '-y', clip_path]
+        clip_paths.append(clip_path)
+    if not clip_paths:
+        return []
+    logging.info(f"[{task_id}] Cutting {len(clip_paths)} clips in a single ffmpeg process.")
+    try:
+        _run_ffmpeg(cmd)
+        return [p for p in clip_paths if os.path.exists(p)]
+    except subprocess.CalledProcessError as e:
+        stderr_decoded = e.stderr.decode('utf-8', errors='replace') if e.stderr else "Unknown FFmpeg error"
+        logging.error(f"[{task_id}] Single-process clip creation failed: {stderr_decoded}")
         return None
 
-# --- STAGE 4: VIDEO CLIPPING (UPDATED TO USE START/END TIMESTAMPS AND OVERLAYS) ---
 def create_clips_from_events(events_path, video_path, task_id):
     """Creates video clips using start and end timestamps from events, adding overlays."""
     logging.info(f"[{task_id}] Starting clip creation from detailed events with overlays: {events_path}")
@@ -209,76 +938,27 @@ def create_clips_from_events(events_path, video_path, task_id):
         if not events:
             logging.warning(f"[{task_id}] No events found. Skipping clipping.")
             return []
-            
+
         # clips_dir will be in the same directory as the events_path file (e.g., task_X/clips)
         clips_dir = os.path.join(os.path.dirname(events_path), "clips")
         os.makedirs(clips_dir, exist_ok=True)
-        created_clips = []
 
-        for i, event in enumerate(events):
-            try:
-                start_seconds = time_to_seconds(event['start_timestamp'])
-                end_seconds = time_to_seconds(event['end_timestamp'])
-                duration = end_seconds - start_seconds
+        if _clip_single_process_enabled() and not _clip_reencode_enabled():
+            created_clips = _create_clips_single_process(events, video_path, clips_dir, task_id)
+            if created_clips is not None:
+                logging.info(f"[{task_id}] Successfully created {len(created_clips)} clips in {clips_dir}.")
+                return created_clips
+            logging.warning(f"[{task_id}] Falling back to per-clip ffmpeg processes.")
 
-                if duration <= 0:
-                    logging.warning(f"[{task_id}] Skipping event with invalid duration (<=0s): {event['event_type']} from {event['start_timestamp']} to {event['end_timestamp']}")
-                    continue
+        # Events are independent, so encode them in parallel; the real work
+        # happens in ffmpeg subprocesses, so threads are enough. Capped at
+        # the event count so short matches don't spin up idle workers.
+        with ThreadPoolExecutor(max_workers=min(_clip_worker_count(), len(events))) as executor:
+            futures = [executor.submit(_encode_one_clip, i, event, video_path, clips_dir, task_id)
+                       for i, event in enumerate(events)]
+            created_clips = [f.result() for f in futures]
+        created_clips = [p for p in created_clips if p]
 
-                # Sanitize event_type for filename
-                filename_event_type = event['event_type'].replace(' ', '_').lower()
-                clip_filename = f"clip_{i+1}_{filename_event_type}.mp4"
-                clip_path = os.path.join(clips_dir, clip_filename)
-                
-                # Prepare event_data for overlay function
-                event_data_for_overlay = {
-                    'type': event['event_type'].capitalize(), # e.g., "Goal", "Foul", "Missed goal"
-                    'team_name': event['team'],
-                    'description': event['description']
-                }
-                text_overlay, box_color_overlay = get_event_overlay_config(event_data_for_overlay)
-
-                logging.info(f"[{task_id}] Creating clip {i+1}: {clip_filename} ({event['event_type']}) from {start_seconds}s for {duration}s")
-
-                input_stream = ffmpeg.input(video_path, ss=start_seconds, t=duration)
-                video_stream = input_stream.video
-                audio_stream = input_stream.audio
-                
-                video_stream = ffmpeg.drawtext(
-                    video_stream,
-                    text=text_overlay,
-                    fontsize=90,        # As per user's example
-                    fontcolor='white',
-                    box=1,
-                    boxcolor=box_color_overlay,
-                    boxborderw=10,      # As per user's example
-                    x='(w-text_w)/2',   # Centered horizontally
-                    y='(h-text_h)/2',   # Centered vertically
-                    enable='between(t,0,2)' # Show overlay for the first 2 seconds
-                )
-                
-                output_stream = ffmpeg.output(
-                    video_stream,
-                    audio_stream,
-                    clip_path,
-                    acodec='copy',
-                    vcodec='libx264',
-                    video_bitrate='5M', # As per user's example
-                    # preset='fast', # Optional: for faster encoding, might reduce quality
-                    movflags='faststart' # Good for web playback
-                )
-                
-                ffmpeg.run(output_stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
-                created_clips.append(clip_path)
-                logging.info(f"[{task_id}] Successfully created clip: {clip_path}")
-
-            except ffmpeg.Error as e:
-                stderr_decoded = e.stderr.decode('utf-8', errors='replace') if e.stderr else "Unknown FFmpeg error"
-                logging.error(f"[{task_id}] FFmpeg error creating clip for event {i+1} ({event.get('event_type', 'N/A')}): {stderr_decoded}")
-            except Exception as e:
-                logging.error(f"[{task_id}] Failed to create clip for event {i+1} ({event.get('event_type', 'N/A')}). Error: {e}", exc_info=True)
-                continue
-        
         logging.info(f"[{task_id}] Successfully created {len(created_clips)} clips in {clips_dir}.")
         return created_clips
 
@@ -293,8 +973,59 @@ def create_clips_from_events(events_path, video_path, task_id):
         return None # Or return []
 
 # --- STAGE 5: STITCHING (UPDATED) ---
-def stitch_clips(clip_paths, task_id, output_filename="summary.mp4"):
-    logging.info(f"[{task_id}] Starting to stitch {len(clip_paths)} clips using ffmpeg-python into {output_filename}.")
+def _probe_duration(media_path):
+    try:
+        out = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', media_path],
+            capture_output=True, text=True, check=True).stdout.strip()
+        return float(out)
+    except Exception as e:
+        logging.warning(f"Could not probe duration of {media_path}: {e}")
+        return None
+
+def _clip_stream_params(clip_path):
+    """codec/width/height/fps signature of the first video stream, used to
+    decide whether the concat demuxer can join clips losslessly. None when
+    probing fails."""
+    try:
+        return subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'stream=codec_name,width,height,r_frame_rate',
+             '-of', 'csv=p=0', clip_path],
+            capture_output=True, text=True, check=True).stdout.strip()
+    except Exception as e:
+        logging.warning(f"Could not probe stream parameters of {clip_path}: {e}")
+        return None
+
+def _overlay_filters_for_clips(clip_paths, events):
+    """drawtext filters for each clip's event, with enable windows offset to
+    the clip's position on the stitched timeline."""
+    filters = []
+    offset = 0.0
+    for clip_path in clip_paths:
+        duration = _probe_duration(clip_path)
+        event = _event_for_clip(clip_path, events)
+        if event is not None:
+            text_overlay, box_color_overlay = _overlay_for_event(event)
+            filters.append(_drawtext_filter(
+                text_overlay, box_color_overlay,
+                f'between(t,{offset:.3f},{offset + 2:.3f})'))
+        offset += duration or 0.0
+    return filters
+
+def _event_for_clip(clip_path, events):
+    """Map clip_<n>_<type>.mp4 back to its event (n is the 1-based index)."""
+    try:
+        index = int(os.path.basename(clip_path).split('_')[1]) - 1
+        if 0 <= index < len(events):
+            return events[index]
+    except (ValueError, IndexError):
+        pass
+    return None
+
+def stitch_clips(clip_paths, task_id, output_filename="summary.mp4", events=None):
+    logging.info(f"[{task_id}] Starting to stitch {len(clip_paths)} clips into {output_filename}.")
     if not clip_paths:
         logging.warning(f"[{task_id}] No clip paths provided. Skipping stitching.")
         return None
@@ -314,16 +1045,57 @@ def stitch_clips(clip_paths, task_id, output_filename="summary.mp4"):
                 f.write(f"file '{clip_path}'\n")
 
         summary_path = os.path.join(task_dir, output_filename)
-        
+
         logging.info(f"[{task_id}] Stitching clips listed in {concat_list_path} to {summary_path}.")
 
-        input_concat = ffmpeg.input(concat_list_path, format='concat', safe=0)
-        # c='copy' for fast stitching if codecs are compatible (which they should be from clipping stage)
-        # movflags='faststart' optimizes for web streaming.
-        output_stream = ffmpeg.output(input_concat, summary_path, c='copy', movflags='faststart')
-        
-        ffmpeg.run(output_stream, overwrite_output=True, capture_stdout=True, capture_stderr=True)
-        
+        # The concat demuxer assumes every clip shares codec parameters;
+        # mismatches (different GOP/size/fps after stream-copy cuts) produce
+        # glitches or silent failures, so verify once up front.
+        param_set = {_clip_stream_params(p) for p in absolute_clip_paths}
+        param_set.discard(None)
+
+        if len(param_set) > 1:
+            # Heterogeneous clips: decode everything once through the concat
+            # filter and re-encode in a single pass, overlays included.
+            logging.warning(f"[{task_id}] Clip codec parameters differ; stitching with the concat filter and one re-encode.")
+            cmd = ['ffmpeg'] + _FFMPEG_THREADS
+            for clip_path in absolute_clip_paths:
+                cmd += ['-i', clip_path]
+            n = len(absolute_clip_paths)
+            graph = (''.join(f'[{i}:v][{i}:a]' for i in range(n))
+                     + f'concat=n={n}:v=1:a=1[vc][outa]')
+            filters = [] if events is None or _clip_reencode_enabled() \
+                else _overlay_filters_for_clips(absolute_clip_paths, events)
+            if filters:
+                graph += f";[vc]{','.join(filters)}[outv]"
+                video_map = '[outv]'
+            else:
+                video_map = '[vc]'
+            cmd += ['-filter_complex', graph, '-map', video_map, '-map', '[outa]']
+            cmd += _video_encode_argv()
+            cmd += ['-c:a', 'aac']
+        else:
+            cmd = (['ffmpeg'] + _FFMPEG_THREADS
+                   + ['-f', 'concat', '-safe', '0', '-i', concat_list_path])
+            if events is None or _clip_reencode_enabled():
+                # Overlays are already baked into the clips (or no event metadata
+                # was supplied): a plain remux is enough.
+                # -c copy for fast stitching if codecs are compatible (which they should be from clipping stage)
+                # -movflags faststart optimizes for web streaming.
+                cmd += ['-c', 'copy']
+            else:
+                # Clips are stream copies, so this is the single encode pass of
+                # the pipeline: draw each event's overlay over the first 2
+                # seconds of its clip in the summary timeline.
+                filters = _overlay_filters_for_clips(absolute_clip_paths, events)
+                if filters:
+                    cmd += ['-vf', ','.join(filters)]
+                cmd += _video_encode_argv()
+                cmd += ['-c:a', 'copy']
+        cmd += ['-movflags', 'faststart', '-y', summary_path]
+
+        _run_ffmpeg(cmd)
+
         logging.info(f"[{task_id}] Summary video created successfully at: {summary_path}")
         
         try:
@@ -334,7 +1106,7 @@ def stitch_clips(clip_paths, task_id, output_filename="summary.mp4"):
             
         return summary_path
 
-    except ffmpeg.Error as e:
+    except subprocess.CalledProcessError as e:
         stderr_decoded = e.stderr.decode('utf-8', errors='replace') if e.stderr else "Unknown FFmpeg error"
         logging.error(f"[{task_id}] FFmpeg error during video stitching: {stderr_decoded}")
         # Optionally, preserve concat_list_path for debugging if stitching fails
@@ -349,17 +1121,98 @@ def stitch_clips(clip_paths, task_id, output_filename="summary.mp4"):
                 pass # Ignore if removal fails
         return None
 
+# --- STAGE 4+5 FUSED: SINGLE-PASS SUMMARY RENDER ---
+def render_summary_from_events(events, video_path, summary_path, task_id):
+    """Render the summary video in one ffmpeg pass straight from the source.
+
+    select/aselect keep only the event windows (one decode of the source,
+    one encode of the output) and the drawtext overlays are applied with
+    enable windows computed on the output timeline, so no intermediate clip
+    files are written at all. Returns summary_path, or None on failure.
+    """
+    windows = []
+    for event in events:
+        try:
+            start_seconds, end_seconds = _event_window_seconds(event)
+        except Exception:
+            logging.warning(f"[{task_id}] Skipping event with unparsable timestamps: {event}")
+            continue
+        if end_seconds > start_seconds:
+            windows.append((start_seconds, end_seconds, event))
+        else:
+            logging.warning(f"[{task_id}] Skipping event with invalid duration (<=0s): {event['event_type']} from {event['start_timestamp']} to {event['end_timestamp']}")
+    if not windows:
+        logging.warning(f"[{task_id}] No valid event windows. Skipping summary render.")
+        return None
+    windows.sort(key=lambda w: w[0])
+
+    select_expr = '+'.join(f'between(t,{s},{e})' for s, e, _ in windows)
+    video_filters = [f"select='{select_expr}'", 'setpts=N/FRAME_RATE/TB']
+    offset = 0
+    for start_seconds, end_seconds, event in windows:
+        text_overlay, box_color_overlay = _overlay_for_event(event)
+        video_filters.append(_drawtext_filter(
+            text_overlay, box_color_overlay, f'between(t,{offset},{offset + 2})'))
+        offset += end_seconds - start_seconds
+    filter_complex = (f"[0:v]{','.join(video_filters)}[v];"
+                      f"[0:a]aselect='{select_expr}',asetpts=N/SR/TB[a]")
+
+    cmd = (['ffmpeg'] + _FFMPEG_THREADS
+           + ['-i', video_path, '-filter_complex', filter_complex,
+              '-map', '[v]', '-map', '[a]']
+           + _video_encode_argv()
+           + ['-c:a', 'aac', '-movflags', 'faststart', '-y', summary_path])
+
+    logging.info(f"[{task_id}] Rendering summary from {len(windows)} events in a single ffmpeg pass.")
+    try:
+        _run_ffmpeg(cmd)
+        logging.info(f"[{task_id}] Summary video created successfully at: {summary_path}")
+        return summary_path
+    except subprocess.CalledProcessError as e:
+        stderr_decoded = e.stderr.decode('utf-8', errors='replace') if e.stderr else "Unknown FFmpeg error"
+        logging.error(f"[{task_id}] FFmpeg error during single-pass summary render: {stderr_decoded}")
+        return None
+    except Exception as e:
+        logging.error(f"[{task_id}] An error occurred during single-pass summary render: {e}", exc_info=True)
+        return None
+
 def log_time_and_progress(task_id, stage, start_time, end_time, progress, total_stages):
     elapsed = end_time - start_time
     logging.info(f"[{task_id}] {stage} completed in {elapsed:.2f} seconds. Progress: {progress}/{total_stages}")
 
-def get_file_hash(filepath, block_size=65536):
-    """Compute SHA256 hash of a file for caching purposes."""
-    sha256 = hashlib.sha256()
+def new_file_hasher():
+    """Hasher used for cache keys: BLAKE3 when installed (SIMD-accelerated,
+    multi-GB/s per core), SHA-256 otherwise. Only collision resistance
+    matters here, not the specific algorithm."""
+    if blake3 is not None:
+        return blake3.blake3()
+    return hashlib.sha256()
+
+def get_file_hash(filepath, block_size=16 * 1024 * 1024):
+    """Compute the cache-key hash of a file."""
+    if blake3 is not None:
+        # update_mmap hashes the whole mapping with an internal threadpool.
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(filepath)
+        return hasher.hexdigest()
+    hasher = hashlib.sha256()
     with open(filepath, 'rb') as f:
-        for block in iter(lambda: f.read(block_size), b''):
-            sha256.update(block)
-    return sha256.hexdigest()
+        try:
+            # One mmap'd update instead of thousands of small reads: the
+            # hash runs in a single C call (GIL released) while the kernel's
+            # read-ahead keeps the disk busy.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hasher.update(mm)
+        except (ValueError, OSError):
+            # Empty file, or mapping failed — fall back to buffered reads.
+            buf = bytearray(block_size)
+            view = memoryview(buf)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                hasher.update(view[:n])
+    return hasher.hexdigest()
 
 def check_file_integrity(filepath):
     """Check if a file exists and is not corrupt/empty."""
@@ -375,29 +1228,144 @@ def check_file_integrity(filepath):
     except Exception:
         return False
 
+# --- CACHE MANIFEST ---
+# One manifest.json per cache entry records which stages have completed and
+# where their outputs live. run_pipeline reads it once at the top instead of
+# probing the directory per stage (exists/listdir/json.load), so a fully warm
+# hit costs a single small JSON read plus one stat of summary.mp4.
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if isinstance(manifest.get('stages'), dict):
+            return manifest
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {'stages': {}}
+
+def save_manifest(cache_dir, manifest):
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def _mark_stage_done(manifest, cache_dir, stage_name, path=None):
+    manifest['stages'][stage_name] = {'path': path, 'completed_at': time.time()}
+    save_manifest(cache_dir, manifest)
+
+class _LazyEventsFile:
+    """List-like view of events.json that defers the read until the events
+    are actually touched — on a warm cache hit nothing downstream needs
+    them, so the file is never opened."""
+    def __init__(self, path):
+        self._path = path
+        self._events = None
+
+    def _load(self):
+        if self._events is None:
+            try:
+                with open(self._path, 'r', encoding='utf-8') as f:
+                    self._events = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._events = []
+        return self._events
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+@contextmanager
+def _cache_lock(cache_dir):
+    """Serialize pipeline runs against one cache entry.
+
+    Two simultaneous uploads of the same video would otherwise both miss the
+    cache and do all the work twice; the loser of the flock race instead
+    waits and finds every stage already cached. Degrades to a no-op where
+    fcntl is unavailable."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(cache_dir, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _publish_to_task_dir(src_path, task_dir, task_id):
+    """Expose a cached artifact under the task directory for the web routes.
+
+    Symlinks avoid duplicating multi-hundred-MB summary videos per task; on
+    filesystems without symlink support this falls back to a copy."""
+    if not src_path or not os.path.exists(src_path):
+        return
+    dest = os.path.join(task_dir, os.path.basename(src_path))
+    if os.path.abspath(dest) == os.path.abspath(src_path):
+        return
+    try:
+        if os.path.lexists(dest):
+            os.remove(dest)
+        try:
+            os.symlink(os.path.abspath(src_path), dest)
+        except (OSError, NotImplementedError):
+            shutil.copy(src_path, dest)
+    except Exception as e:
+        logging.warning(f"[{task_id}] Could not publish {src_path} to {task_dir}: {e}")
+
 # --- Example pipeline orchestration with caching ---
-def run_pipeline(video_path, task_id):
+def run_pipeline(video_path, task_id, video_hash=None):
+    logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Overall pipeline process started.")
+
+    # Cache key for the video file. The upload handler hashes the bytes as
+    # they stream in and passes the digest along; only CLI-style callers
+    # fall back to re-reading the file here.
+    if video_hash is None:
+        video_hash = get_file_hash(video_path)
+    cache_dir = os.path.join('uploads', 'cache', CACHE_HASH_VERSION, video_hash)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Hold the per-entry lock for the whole run: every stage writes into the
+    # cache directory directly, so a concurrent task for the same video must
+    # not observe (or race to produce) half-written artifacts.
+    with _cache_lock(cache_dir):
+        results = _run_pipeline_stages(video_path, task_id, cache_dir)
+
+    # The GUI routes (/task/<id>/events, /task/<id>/transcript,
+    # /stream/<id>/...) serve from the task directory, so link the cached
+    # artifacts into it.
+    task_dir = os.path.dirname(video_path)
+    _publish_to_task_dir(results.get('txt_path'), task_dir, task_id)
+    _publish_to_task_dir(os.path.join(cache_dir, 'events.json'), task_dir, task_id)
+    _publish_to_task_dir(results.get('summary_path'), task_dir, task_id)
+    return results
+
+def _run_pipeline_stages(video_path, task_id, cache_dir):
     total_stages = 5
     progress = 0
     stage_times = {}
     results = {}
 
-    logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Overall pipeline process started.")
-
-    # Compute hash for the video file to use as a cache key
-    video_hash = get_file_hash(video_path)
-    cache_dir = os.path.join('uploads', 'cache', video_hash)
-    os.makedirs(cache_dir, exist_ok=True)
+    # One manifest read replaces the per-stage exists/listdir probes below.
+    manifest = load_manifest(cache_dir)
+    stages_done = manifest['stages']
 
     # Stage 1: Audio Extraction (cache audio)
     audio_path = os.path.join(cache_dir, 'audio.wav')
-    if not os.path.exists(audio_path):
+    if stages_done.get('audio') is None:
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Audio Extraction Step ---")
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Audio Extraction Script...")
         start = time.time()
-        extracted_audio = extract_audio(video_path, task_id)
+        extracted_audio = extract_audio(video_path, task_id, out_path=audio_path)
         if extracted_audio:
-            os.replace(extracted_audio, audio_path)
+            # Only a successful stage is recorded: a failed one must be
+            # retried by the next run, not cached as complete.
+            _mark_stage_done(manifest, cache_dir, 'audio', audio_path)
         end = time.time()
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Audio Extraction Script STDOUT:")
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Audio Extraction Script script execution completed.")
@@ -411,14 +1379,17 @@ def run_pipeline(video_path, task_id):
     # Stage 2: Transcription (cache transcript)
     txt_path = os.path.join(cache_dir, 'transcript.txt')
     json_path = os.path.join(cache_dir, 'transcript.json')
-    if not (os.path.exists(txt_path) and os.path.exists(json_path)):
+    # Fresh transcriptions hand their segments straight to stage 3; only
+    # warm-cache runs re-read transcript.json.
+    transcript_segments = None
+    if stages_done.get('transcript') is None:
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Transcription Step ---")
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Transcription Script...")
         start = time.time()
-        t_path, j_path = transcribe_audio(audio_path, task_id)
-        if t_path and j_path:
-            os.replace(t_path, txt_path)
-            os.replace(j_path, json_path)
+        t_path, _, transcript_segments = transcribe_audio(
+            audio_path, task_id, out_txt=txt_path, out_json=json_path)
+        if t_path:
+            _mark_stage_done(manifest, cache_dir, 'transcript', txt_path)
         end = time.time()
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Transcription Script STDOUT:")
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Transcription Script script execution completed.")
@@ -430,60 +1401,160 @@ def run_pipeline(video_path, task_id):
     results['txt_path'] = txt_path
     results['json_path'] = json_path
 
-    # Stage 3: Event Extraction (cache events)
+    # Single-pass mode (default): after event extraction, render the summary
+    # directly from the source video with select/aselect + drawtext in one
+    # ffmpeg run — one decode, one encode, no intermediate clip files. The
+    # clip+stitch pipeline below remains as the fallback, and serves
+    # CLIP_REENCODE=1, which needs the frame-accurate per-clip cuts.
+    single_pass = os.getenv('SUMMARY_SINGLE_PASS', '1') == '1' and not _clip_reencode_enabled()
     events_path = os.path.join(cache_dir, 'events.json')
-    if not os.path.exists(events_path):
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Event Extraction Step ---")
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Event Extraction Script...")
-        start = time.time()
-        formatted_transcript = format_transcript_with_timestamps(json_path)
-        events = extract_events_with_llm(formatted_transcript, task_id)
-        if events:
-            with open(events_path, 'w', encoding='utf-8') as f:
-                json.dump(events, f, indent=2, ensure_ascii=False)
-        end = time.time()
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Event Extraction Script STDOUT:")
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Event Extraction Script script execution completed.")
-        progress += 1
-        log_time_and_progress(task_id, "Event Extraction", start, end, progress, total_stages)
-    else:
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - [CACHE] Events already extracted for this video.")
-        progress += 1
-    with open(events_path, 'r', encoding='utf-8') as f:
-        events = json.load(f)
-    results['events'] = events
-
-    # Stage 4: Video Clipping (cache clips)
     clips_dir = os.path.join(cache_dir, 'clips')
+    summary_path = os.path.join(cache_dir, 'summary.mp4')
+
+    if single_pass and stages_done.get('clips') is None:
+        # Stage 3: Event Extraction (cache events)
+        if stages_done.get('events') is None:
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Event Extraction Step ---")
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Event Extraction Script...")
+            start = time.time()
+            formatted_transcript = format_transcript_with_timestamps(
+                transcript_segments if transcript_segments is not None else json_path)
+            events = extract_events_with_llm(formatted_transcript, task_id)
+            if events:
+                with open(events_path, 'w', encoding='utf-8') as f:
+                    json.dump(events, f, indent=2, ensure_ascii=False)
+                _mark_stage_done(manifest, cache_dir, 'events', events_path)
+            end = time.time()
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Event Extraction Script script execution completed.")
+            progress += 1
+            log_time_and_progress(task_id, "Event Extraction", start, end, progress, total_stages)
+        else:
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - [CACHE] Events already extracted for this video.")
+            progress += 1
+        # Lazy: on a warm summary hit the events are never read at all.
+        events = _LazyEventsFile(events_path)
+        results['events'] = events
+        results['clips'] = []
+
+        # Stage 4 + 5: single-pass summary render (cache summary)
+        if stages_done.get('summary') is not None and os.path.exists(summary_path):
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - [CACHE] Summary video already exists for this video.")
+            progress += 2
+            rendered = summary_path
+        elif events:
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Summary Render Step (single pass) ---")
+            start = time.time()
+            rendered = render_summary_from_events(events, video_path, summary_path, task_id)
+            end = time.time()
+            progress += 2
+            log_time_and_progress(task_id, "Summary Render", start, end, progress, total_stages)
+        else:
+            rendered = None
+        if rendered:
+            if stages_done.get('summary') is None:
+                _mark_stage_done(manifest, cache_dir, 'summary', summary_path)
+            results['summary_path'] = summary_path
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - 🔚 Process completed successfully")
+            return results
+        logging.warning(f"[{task_id}] Single-pass summary render did not produce output; falling back to the clip pipeline.")
+
+    # Stage 3 + 4: Event Extraction and Video Clipping. When neither stage is
+    # cached, the Gemini response is streamed and each parsed event is handed
+    # to the clip encoder pool immediately, overlapping the network-bound LLM
+    # latency with the CPU-bound libx264 encodes.
     os.makedirs(clips_dir, exist_ok=True)
+    events_cached = stages_done.get('events') is not None
+    clips_cached = stages_done.get('clips') is not None
     clips = []
-    if not os.listdir(clips_dir):
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Highlight Generation Step ---")
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Highlight Generation Script...")
+
+    if not events_cached and not clips_cached:
+        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Event Extraction + Highlight Generation Step (pipelined) ---")
         start = time.time()
-        new_clips = create_clips_from_events(events_path, video_path, task_id)
-        for clip in new_clips or []:
-            os.replace(clip, os.path.join(clips_dir, os.path.basename(clip)))
+        formatted_transcript = format_transcript_with_timestamps(
+                transcript_segments if transcript_segments is not None else json_path)
+        events = []
+        extraction_ok = True
+        try:
+            with ThreadPoolExecutor(max_workers=_clip_worker_count()) as executor:
+                futures = []
+                for event in iter_events_from_llm(formatted_transcript, task_id):
+                    futures.append(executor.submit(_encode_one_clip, len(events), event,
+                                                   video_path, clips_dir, task_id))
+                    events.append(event)
+                # Executor shutdown is the barrier before stitching.
+                for future in futures:
+                    future.result()
+        except Exception as e:
+            # The generator died mid-stream: `events` is truncated, so don't
+            # cache it (or the clips cut from it) as this video's truth.
+            logging.error(f"[{task_id}] Pipelined event extraction/clipping failed: {e}")
+            extraction_ok = False
+        if extraction_ok and events:
+            with open(events_path, 'w', encoding='utf-8') as f:
+                json.dump(events, f, indent=2, ensure_ascii=False)
+            _mark_stage_done(manifest, cache_dir, 'events', events_path)
+            _mark_stage_done(manifest, cache_dir, 'clips', clips_dir)
         end = time.time()
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Highlight Generation Script STDOUT:")
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Highlight Generation Script script execution completed.")
-        progress += 1
-        log_time_and_progress(task_id, "Video Clipping", start, end, progress, total_stages)
+        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Event Extraction + Highlight Generation completed.")
+        progress += 2
+        log_time_and_progress(task_id, "Event Extraction + Video Clipping", start, end, progress, total_stages)
     else:
-        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - [CACHE] Clips already exist for this video.")
-        progress += 1
+        # Stage 3: Event Extraction (cache events)
+        if not events_cached:
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Event Extraction Step ---")
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Event Extraction Script...")
+            start = time.time()
+            formatted_transcript = format_transcript_with_timestamps(
+                transcript_segments if transcript_segments is not None else json_path)
+            events = extract_events_with_llm(formatted_transcript, task_id)
+            if events:
+                with open(events_path, 'w', encoding='utf-8') as f:
+                    json.dump(events, f, indent=2, ensure_ascii=False)
+                _mark_stage_done(manifest, cache_dir, 'events', events_path)
+            end = time.time()
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Event Extraction Script STDOUT:")
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Event Extraction Script script execution completed.")
+            progress += 1
+            log_time_and_progress(task_id, "Event Extraction", start, end, progress, total_stages)
+        else:
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - [CACHE] Events already extracted for this video.")
+            progress += 1
+
+        # Stage 4: Video Clipping (cache clips)
+        if not clips_cached:
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Highlight Generation Step ---")
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Highlight Generation Script...")
+            start = time.time()
+            # create_clips_from_events writes next to events_path, i.e.
+            # straight into the cache's clips/ directory. None means the
+            # stage failed (not "no events"), so leave it unmarked to retry.
+            new_clips = create_clips_from_events(events_path, video_path, task_id)
+            if new_clips is not None:
+                _mark_stage_done(manifest, cache_dir, 'clips', clips_dir)
+            end = time.time()
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Highlight Generation Script STDOUT:")
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Highlight Generation Script script execution completed.")
+            progress += 1
+            log_time_and_progress(task_id, "Video Clipping", start, end, progress, total_stages)
+        else:
+            logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - [CACHE] Clips already exist for this video.")
+            progress += 1
+
+    events = _LazyEventsFile(events_path)
+    results['events'] = events
     clips = [os.path.join(clips_dir, f) for f in sorted(os.listdir(clips_dir)) if f.endswith('.mp4')]
     results['clips'] = clips
 
     # Stage 5: Stitching (cache summary)
-    summary_path = os.path.join(cache_dir, 'summary.mp4')
-    if not os.path.exists(summary_path):
+    if stages_done.get('summary') is None or not os.path.exists(summary_path):
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - --- Starting Stitching Step ---")
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Executing script for: Stitching Script...")
         start = time.time()
-        new_summary = stitch_clips(clips, task_id, output_filename='summary.mp4')
-        if new_summary:
-            os.replace(new_summary, summary_path)
+        # stitch_clips writes summary.mp4 beside the clips dir, which is the
+        # cache directory itself.
+        stitched = stitch_clips(clips, task_id, output_filename='summary.mp4', events=events)
+        if stitched:
+            _mark_stage_done(manifest, cache_dir, 'summary', summary_path)
         end = time.time()
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - Stitching Script STDOUT:")
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - SUCCESS: Stitching Script script execution completed.")
@@ -492,9 +1563,12 @@ def run_pipeline(video_path, task_id):
     else:
         logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - [CACHE] Summary video already exists for this video.")
         progress += 1
-    results['summary_path'] = summary_path
-
-    logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - 🔚 Process completed successfully")
+    # Only report a summary that is actually on disk: a failed events stage
+    # yields no clips and no stitched output, and the caller turns a missing
+    # summary_path into an Error status instead of a Complete with a dead link.
+    if os.path.exists(summary_path):
+        results['summary_path'] = summary_path
+        logging.info(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} - 🔚 Process completed successfully")
     return results
 
 # --- In your Flask route, update to use progress bar ---
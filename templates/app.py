@@ -54,7 +54,7 @@ def run_pipeline(task_id, video_path):
     
     # Stage 2: Transcription
     update_status(task_dir, "Transcribing audio (using 'small' model)...")
-    _, json_path = transcribe_audio(audio_path, task_id)
+    _, json_path, _ = transcribe_audio(audio_path, task_id)
     if not json_path:
         update_status(task_dir, "Error: Transcription failed.")
         return